@@ -2,15 +2,20 @@
 obtained from config-files, forms, external services or command-line
 parsing, converted from JSON/YAML (or something else) to Python data-types."""
 
+import functools
 import inspect
+import operator
 import re
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
+    Collection,
     Dict,
+    FrozenSet,
     Generic,
     Iterable,
+    Iterator,
     List,
     NoReturn,
     Sequence,
@@ -129,6 +134,15 @@ class And(Generic[TSchema]):
     Utility function to combine validation directives in AND Boolean fashion.
     """
 
+    __slots__ = (
+        "_args",
+        "_error",
+        "_ignore_extra_keys",
+        "_schema_class",
+        "_schemas",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         *args: Union[TSchema, Callable[..., Any]],
@@ -140,6 +154,8 @@ class And(Generic[TSchema]):
         self._error: Union[str, None] = error
         self._ignore_extra_keys: bool = ignore_extra_keys
         self._schema_class: Type[TSchema] = schema if schema is not None else Schema
+        # Sub schemas wrapping the arguments, built on first validation
+        self._schemas: Union[Tuple[TSchema, ...], None] = None
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({', '.join(repr(a) for a in self._args)})"
@@ -161,8 +177,10 @@ class And(Generic[TSchema]):
             data = sub_schema.validate(data, **kwargs)
         return data
 
-    def _build_schemas(self) -> List[TSchema]:
-        return [self._build_schema(s) for s in self._args]
+    def _build_schemas(self) -> Tuple[TSchema, ...]:
+        if self._schemas is None:
+            self._schemas = tuple(self._build_schema(s) for s in self._args)
+        return self._schemas
 
     def _build_schema(self, arg: Any) -> TSchema:
         # Assume self._schema_class(arg, ...) returns an instance of TSchema
@@ -180,6 +198,8 @@ class Or(And[TSchema]):
     xor-ish Or instance and one wants to use it another time, one needs to call
     reset() to put the match_count back to 0."""
 
+    __slots__ = ("only_one", "match_count")
+
     def __init__(
         self,
         *args: Union[TSchema, Callable[..., Any]],
@@ -190,6 +210,20 @@ class Or(And[TSchema]):
         self.match_count: int = 0
         super().__init__(*args, **kwargs)
 
+    def clone(self) -> "Or[TSchema]":
+        """Return a new Or with the same arguments and options, and its
+        match_count back to 0."""
+        return self.__class__(
+            *self._args,
+            only_one=self.only_one,
+            error=self._error,
+            ignore_extra_keys=self._ignore_extra_keys,
+            schema=self._schema_class,
+        )
+
+    def __copy__(self) -> "Or[TSchema]":
+        return self.clone()
+
     def reset(self) -> None:
         failed: bool = self.match_count > 1 and self.only_one
         self.match_count = 0
@@ -205,9 +239,15 @@ class Or(And[TSchema]):
         :param data: data to be validated by provided schema.
         :return: return validated data if not validation
         """
-        autos: List[str] = []
-        errors: List[Union[str, None]] = []
-        for sub_schema in self._build_schemas():
+        # Alternatives that plainly cannot match (a type the data is not an
+        # instance of, a different literal) are skipped without raising, and
+        # only validated again for their message if nothing matches
+        skip = self._schema_class.validate is Schema.validate
+        failures: List[Union[SchemaError, TSchema]] = []
+        for arg, sub_schema in zip(self._args, self._build_schemas()):
+            if skip and _cannot_match(arg, data):
+                failures.append(sub_schema)
+                continue
             try:
                 validation: Any = sub_schema.validate(data, **kwargs)
                 self.match_count += 1
@@ -215,8 +255,17 @@ class Or(And[TSchema]):
                     break
                 return validation
             except SchemaError as _x:
-                autos += _x.autos
-                errors += _x.errors
+                failures.append(_x)
+        autos: List[str] = []
+        errors: List[Union[str, None]] = []
+        for failure in failures:
+            if not isinstance(failure, SchemaError):
+                try:
+                    failure.validate(data, **kwargs)
+                except SchemaError as _x:
+                    failure = _x
+            autos += failure.autos
+            errors += failure.errors
         raise SchemaError(
             ["%r did not validate %r" % (self, data)] + autos,
             [self._error.format(data) if self._error else None] + errors,
@@ -228,6 +277,8 @@ class Regex:
     Enables schema.py to validate string using regular expressions.
     """
 
+    __slots__ = ("_pattern_str", "_flags_names", "_pattern", "_error", "__weakref__")
+
     # Map all flags bits to a more readable description
     NAMES = [
         "re.ASCII",
@@ -290,21 +341,39 @@ class Use:
     """
     For more general use cases, you can use the Use class to transform
     the data while it is being validated.
+
+    With cache=True, results are remembered for scalar data (strings, bytes,
+    numbers, None), and the same result object is returned for equal data.
+    It is meant for pure callables that return immutable values.
     """
 
+    __slots__ = ("_callable", "_error", "_cached", "__weakref__")
+
     def __init__(
-        self, callable_: Callable[[Any], Any], error: Union[str, None] = None
+        self,
+        callable_: Callable[[Any], Any],
+        error: Union[str, None] = None,
+        cache: bool = False,
     ) -> None:
         if not callable(callable_):
             raise TypeError(f"Expected a callable, not {callable_!r}")
         self._callable: Callable[[Any], Any] = callable_
         self._error: Union[str, None] = error
+        # With cache=True, results for scalar data are remembered, which is
+        # only correct for pure callables such as int or str.lower
+        self._cached: Union[Callable[[Any], Any], None] = (
+            functools.lru_cache(maxsize=256, typed=True)(callable_) if cache else None
+        )
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self._callable!r})"
 
     def validate(self, data: Any, **kwargs: Any) -> Any:
         try:
+            # Containers are never cached: typed=True only tells apart the
+            # type of the container, not of the items equal ones hold
+            if self._cached is not None and type(data) in _LITERAL_KEY_TYPES:
+                return self._cached(data)
             return self._callable(data)
         except SchemaError as x:
             raise SchemaError(
@@ -321,6 +390,18 @@ class Use:
 
 COMPARABLE, CALLABLE, VALIDATOR, TYPE, DICT, ITERABLE = range(6)
 
+_JSON_SCHEMA_DIALECT = "http://json-schema.org/draft-07/schema#"
+
+# JSON schema names for Python types, other types are described as "string"
+_JSON_SCHEMA_TYPES: Dict[Type, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
 
 def _priority(s: Any) -> int:
     """Return priority for a given object."""
@@ -340,6 +421,47 @@ def _priority(s: Any) -> int:
         return COMPARABLE
 
 
+# Types of literal dict schema keys that can be looked up by hash, since
+# equality and hashing agree for them; also the data Use(cache=True) caches
+_LITERAL_KEY_TYPES = (str, bytes, int, float, bool, type(None))
+_NOT_LITERAL = object()
+
+
+def _same_objects(items: Collection[Any], snapshot: Tuple[Any, ...]) -> bool:
+    """Return True if items holds the very objects of snapshot, in order.
+
+    Used to notice that a schema container changed after its analysis was
+    cached.
+    """
+    return len(items) == len(snapshot) and all(map(operator.is_, items, snapshot))
+
+
+def _is_instance(data: Any, s: type) -> bool:
+    """isinstance as a TYPE schema checks it: bool does not pass as int."""
+    return isinstance(data, s) and not (isinstance(data, bool) and s == int)
+
+
+def _cannot_match(s: Any, data: Any) -> bool:
+    """Return True if a plain type or literal schema is sure to reject data."""
+    if type(s) is type:
+        return not _is_instance(data, s)
+    if type(s) in _LITERAL_KEY_TYPES:
+        return not s == data
+    return False
+
+
+def _literal_key_value(key: Any) -> Any:
+    """Return the value a dict schema key matches by equality alone, or
+    _NOT_LITERAL if matching the key needs a full validation."""
+    if isinstance(key, Schema) and type(key).validate is Schema.validate:
+        key = key._schema
+    if isinstance(key, Literal):
+        key = key.schema
+    if type(key) in _LITERAL_KEY_TYPES:
+        return key
+    return _NOT_LITERAL
+
+
 def _invoke_with_optional_kwargs(f: Callable[..., Any], **kwargs: Any) -> Any:
     s = inspect.signature(f)
     if len(s.parameters) == 0:
@@ -347,12 +469,38 @@ def _invoke_with_optional_kwargs(f: Callable[..., Any], **kwargs: Any) -> Any:
     return f(**kwargs)
 
 
+# A dict schema key with the schemas for the key and its value, the key
+# itself if it is a plain type, and whether it is a Hook
+_DictEntry = Tuple[Any, "Schema", "Schema", Union[type, None], bool]
+
+
 class Schema(object):
     """
     Entry point of the library, use this class to instantiate validation
     schema for the data that will be validated.
     """
 
+    __slots__ = (
+        "_schema",
+        "_error",
+        "_ignore_extra_keys",
+        "_name",
+        "_description",
+        "as_reference",
+        "_flavor",
+        "_container_schema",
+        "_alternatives",
+        "_dict_items",
+        "_sorted_keys",
+        "_sorted_entries",
+        "_other_entries",
+        "_entries_by_literal",
+        "_resets",
+        "_defaults",
+        "_required",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         schema: Any,
@@ -368,6 +516,23 @@ class Schema(object):
         self._name: Union[str, None] = name
         self._description: Union[str, None] = description
         self.as_reference: bool = as_reference
+        # Kind of the wrapped schema (one of COMPARABLE ... ITERABLE), child
+        # schemas for containers, and dict schema keys in matching order,
+        # computed on first validation. Container analysis is redone when
+        # the wrapped list or dict has been changed since.
+        self._flavor: Union[int, None] = None
+        self._container_schema: Union[Schema, None] = None
+        self._alternatives: Union[Or, None] = None
+        # The dict schema keys and values the analysis below was made from
+        self._dict_items: Union[Tuple[Tuple[Any, ...], Tuple[Any, ...]], None] = None
+        self._sorted_keys: Union[Tuple[Any, ...], None] = None
+        self._sorted_entries: Tuple[_DictEntry, ...] = ()
+        self._other_entries: Tuple[_DictEntry, ...] = ()
+        self._entries_by_literal: Dict[Any, Tuple[_DictEntry, ...]] = {}
+        self._resets: Tuple[Callable[[], None], ...] = ()
+        self._defaults: Tuple[Optional, ...] = ()
+        # None until prepared, never an empty set standing in for "no keys"
+        self._required: Union[FrozenSet[Any], None] = None
 
         if as_reference and name is None:
             raise ValueError("Schema used as reference should have a name")
@@ -400,6 +565,64 @@ class Schema(object):
             return _priority(s._schema) + 0.5
         return _priority(s)
 
+    def _prepare_dict_keys(self, s: Dict) -> None:
+        """Sort the keys of a dict schema in matching order.
+
+        Each key is paired with the schemas validating it and its value, as
+        (key, key schema, value schema) entries. Keys that can only match data
+        keys equal to a literal value are also indexed by that value, so a
+        data key is only tried against the entries that could possibly match
+        it. Reset callbacks, required keys and Optional keys with a default
+        are collected as well.
+        """
+        Schema = self.__class__
+        e: Union[str, None] = self._error
+        i: bool = self._ignore_extra_keys
+        items = (tuple(s), tuple(s.values()))
+        sorted_skeys = tuple(sorted(s, key=self._dict_key_priority))
+        entries = tuple(
+            (
+                skey,
+                Schema(skey, error=e),
+                # Values of hook keys are not checked for extra keys
+                Schema(s[skey], error=e)
+                if isinstance(skey, Hook)
+                else Schema(s[skey], error=e, ignore_extra_keys=i),
+                skey if type(skey) is type else None,
+                isinstance(skey, Hook),
+            )
+            for skey in sorted_skeys
+        )
+        literals = [_literal_key_value(skey) for skey in sorted_skeys]
+        other_indexes = [n for n, lit in enumerate(literals) if lit is _NOT_LITERAL]
+        literal_indexes: Dict[Any, List[int]] = {}
+        for n, lit in enumerate(literals):
+            if lit is not _NOT_LITERAL:
+                literal_indexes.setdefault(lit, []).append(n)
+
+        other_entries = tuple(entries[n] for n in other_indexes)
+        entries_by_literal = {
+            lit: tuple(entries[n] for n in sorted(indexes + other_indexes))
+            for lit, indexes in literal_indexes.items()
+        }
+        resets = tuple(skey.reset for skey in sorted_skeys if hasattr(skey, "reset"))
+        required = frozenset(k for k in s if not self._is_optional_type(k))
+        defaults = tuple(
+            k for k in s if isinstance(k, Optional) and hasattr(k, "default")
+        )
+
+        # _dict_items marks the schema as prepared, so it is assigned last:
+        # another thread validating concurrently must not see it before the
+        # other fields are in place
+        self._sorted_entries = entries
+        self._other_entries = other_entries
+        self._entries_by_literal = entries_by_literal
+        self._resets = resets
+        self._required = required
+        self._defaults = defaults
+        self._sorted_keys = sorted_skeys
+        self._dict_items = items
+
     @staticmethod
     def _is_optional_type(s: Any) -> bool:
         """Return True if the given key is optional (does not have to be found)"""
@@ -416,6 +639,26 @@ class Schema(object):
         else:
             return True
 
+    def iter_validate(self, data: Iterable[Any], **kwargs: Any) -> Iterator[Any]:
+        """Validate the items of an iterable one at a time, the way a list
+        schema validates its elements, and yield the validated items.
+
+        Unlike validate(), the items are never collected into a container,
+        so a large stream of data can be checked with constant memory.
+        """
+        s: Any = self._schema
+        if _priority(s) != ITERABLE:
+            raise TypeError(
+                f"iter_validate() needs a list, tuple, set or frozenset schema, not {s!r}"
+            )
+        o: Or = Or(
+            *s,
+            error=self._error,
+            schema=self.__class__,
+            ignore_extra_keys=self._ignore_extra_keys,
+        )
+        return (o.validate(d, **kwargs) for d in data)
+
     def _prepend_schema_name(self, message: str) -> str:
         """
         If a custom schema name has been defined, prepends it to the error
@@ -434,21 +677,63 @@ class Schema(object):
         if isinstance(s, Literal):
             s = s.schema
 
-        flavor = _priority(s)
+        flavor = self._flavor
+        if flavor is None:
+            flavor = self._flavor = _priority(s)
+        if flavor == TYPE:
+            if _is_instance(data, s):
+                return data
+            else:
+                message = "%r should be instance of %r" % (data, s.__name__)
+                message = self._prepend_schema_name(message)
+                raise SchemaUnexpectedTypeError(message, e.format(data) if e else None)
+        if flavor in (ITERABLE, DICT):
+            container_type = dict if flavor == DICT else type(s)
+            # A plain type schema returns the data unchanged on success, so
+            # it only has to run for subclasses or to report a mismatch
+            if not (
+                Schema.validate is __class__.validate
+                and isinstance(data, container_type)
+            ):
+                container_schema = self._container_schema
+                if container_schema is None:
+                    container_schema = Schema(container_type, error=e)
+                    self._container_schema = container_schema
+                data = container_schema.validate(data, **kwargs)
         if flavor == ITERABLE:
-            data = Schema(type(s), error=e).validate(data, **kwargs)
-            o: Or = Or(*s, error=e, schema=Schema, ignore_extra_keys=i)
+            if len(s) == 1 and Schema.validate is __class__.validate:
+                (t,) = s
+                # Fast path for a container of a single plain type, e.g. [int]:
+                # elements are returned as is, so only the type check remains.
+                # On any mismatch fall through to report the usual error.
+                if type(t) is type and all(_is_instance(d, t) for d in data):
+                    return type(data)(data)
+            o = self._alternatives
+            if o is None or not _same_objects(s, o.args):
+                o = Or(*s, error=e, schema=Schema, ignore_extra_keys=i)
+                self._alternatives = o
             return type(data)(o.validate(d, **kwargs) for d in data)
         if flavor == DICT:
             exitstack = ExitStack()
-            data = Schema(dict, error=e).validate(data, **kwargs)
             new: Dict = type(data)()  # new - is a dict of the validated values
             coverage: Set = set()  # matched schema keys
             # for each key and value find a schema entry matching them, if any
-            sorted_skeys = sorted(s, key=self._dict_key_priority)
-            for skey in sorted_skeys:
-                if hasattr(skey, "reset"):
-                    exitstack.callback(skey.reset)
+            dict_items = self._dict_items
+            if (
+                dict_items is None
+                or not _same_objects(s, dict_items[0])
+                or not _same_objects(s.values(), dict_items[1])
+            ):
+                self._prepare_dict_keys(s)
+            # Subclasses may transform keys in validate, so for them every
+            # schema key has to be tried, including non-equal literals
+            entries_by_literal = (
+                self._entries_by_literal
+                if Schema.validate is __class__.validate
+                else None
+            )
+            for reset in self._resets:
+                exitstack.callback(reset)
 
             with exitstack:
                 # Evaluate dictionaries last
@@ -456,14 +741,29 @@ class Schema(object):
                     data.items(), key=lambda value: isinstance(value[1], dict)
                 )
                 for key, value in data_items:
-                    for skey in sorted_skeys:
-                        svalue = s[skey]
+                    # Only keys of the literal types are looked up by hash,
+                    # others may define their own equality and are checked
+                    # against every schema key
+                    candidates = (
+                        entries_by_literal.get(key, self._other_entries)
+                        if entries_by_literal is not None
+                        and type(key) in _LITERAL_KEY_TYPES
+                        else self._sorted_entries
+                    )
+                    for skey, key_schema, value_schema, key_type, hook in candidates:
+                        if (
+                            key_type is not None
+                            and entries_by_literal is not None
+                            and not _is_instance(key, key_type)
+                        ):
+                            # Skip plain type keys without raising SchemaError
+                            continue
                         try:
-                            nkey = Schema(skey, error=e).validate(key, **kwargs)
+                            nkey = key_schema.validate(key, **kwargs)
                         except SchemaError:
                             pass
                         else:
-                            if isinstance(skey, Hook):
+                            if hook:
                                 # As the content of the value makes little sense for
                                 # keys with a hook, we reverse its meaning:
                                 # we will only call the handler if the value does match
@@ -473,17 +773,13 @@ class Schema(object):
                                 # value has a certain type, and allowing Forbidden to
                                 # work well in combination with Optional.
                                 try:
-                                    nvalue = Schema(svalue, error=e).validate(
-                                        value, **kwargs
-                                    )
+                                    nvalue = value_schema.validate(value, **kwargs)
                                 except SchemaError:
                                     continue
                                 skey.handler(nkey, data, e)
                             else:
                                 try:
-                                    nvalue = Schema(
-                                        svalue, error=e, ignore_extra_keys=i
-                                    ).validate(value, **kwargs)
+                                    nvalue = value_schema.validate(value, **kwargs)
                                 except SchemaError as x:
                                     k = "Key '%s' error:" % nkey
                                     message = self._prepend_schema_name(k)
@@ -495,8 +791,11 @@ class Schema(object):
                                     new[nkey] = nvalue
                                     coverage.add(skey)
                                     break
-            required = set(k for k in s if not self._is_optional_type(k))
-            if not required.issubset(coverage):
+            required = self._required
+            if required is None:
+                # Not prepared yet, compute it rather than require nothing
+                required = frozenset(k for k in s if not self._is_optional_type(k))
+            if not required <= coverage:
                 missing_keys = required - coverage
                 s_missing_keys = ", ".join(
                     repr(k) for k in sorted(missing_keys, key=repr)
@@ -519,11 +818,9 @@ class Schema(object):
                 raise SchemaWrongKeyError(message, e.format(data) if e else None)
 
             # Apply default-having optionals that haven't been used:
-            defaults = (
-                set(k for k in s if isinstance(k, Optional) and hasattr(k, "default"))
-                - coverage
-            )
-            for default in defaults:
+            for default in self._defaults:
+                if default in coverage:
+                    continue
                 new[default.key] = (
                     _invoke_with_optional_kwargs(default.default, **kwargs)
                     if callable(default.default)
@@ -531,13 +828,6 @@ class Schema(object):
                 )
 
             return new
-        if flavor == TYPE:
-            if isinstance(data, s) and not (isinstance(data, bool) and s == int):
-                return data
-            else:
-                message = "%r should be instance of %r" % (data, s.__name__)
-                message = self._prepend_schema_name(message)
-                raise SchemaUnexpectedTypeError(message, e.format(data) if e else None)
         if flavor == VALIDATOR:
             try:
                 return s.validate(data, **kwargs)
@@ -583,9 +873,50 @@ class Schema(object):
                          Schemas with references are harder to read by humans, but are a lot smaller when there
                          is a lot of reuse
         """
+        s: Any = self._schema
+        if (
+            type(s) is type
+            and s in _JSON_SCHEMA_TYPES
+            and not (self._name or self._description or self.as_reference)
+        ):
+            # Fast path for a bare type, which needs no traversal
+            return {
+                "type": _JSON_SCHEMA_TYPES[s],
+                "$id": schema_id,
+                "$schema": _JSON_SCHEMA_DIALECT,
+            }
 
         seen: Dict[int, Dict[str, Any]] = {}
         definitions_by_name: Dict[str, Dict[str, Any]] = {}
+        definition_names: Dict[int, str] = {}  # id of a referenced schema -> name
+        definition_forms: Dict[Any, str] = {}  # canonical form -> name
+
+        def _key_allows_additional_properties(key: Any) -> bool:
+            """Check if a key is broad enough to allow additional properties"""
+            if isinstance(key, Optional):
+                return _key_allows_additional_properties(key.schema)
+
+            return key == str or key == object
+
+        def _get_key_description(key: Any) -> Union[str, None]:
+            """Get the description associated to a key (as specified in a Literal object). Return None if not a Literal"""
+            if isinstance(key, Optional):
+                return _get_key_description(key.schema)
+
+            if isinstance(key, Literal):
+                return key.description
+
+            return None
+
+        def _get_key_name(key: Any) -> Any:
+            """Get the name of a key (as specified in a Literal object). Return the key unchanged if not a Literal"""
+            if isinstance(key, Optional):
+                return _get_key_name(key.schema)
+
+            if isinstance(key, Literal):
+                return key.schema
+
+            return key
 
         def _json_schema(
             schema: "Schema",
@@ -593,6 +924,9 @@ class Schema(object):
             description: Union[str, None] = None,
             allow_reference: bool = True,
         ) -> Dict[str, Any]:
+            # Swapped out while generating a name-clash candidate, see below
+            nonlocal seen, definitions_by_name, definition_names, definition_forms
+
             def _create_or_use_ref(return_dict: Dict[str, Any]) -> Dict[str, Any]:
                 """If not already seen, return the provided part of the schema unchanged.
                 If already seen, give an id to the already seen dict and return a reference to the previous part
@@ -610,22 +944,6 @@ class Schema(object):
                     seen[hashed]["$id"] = id_str
                     return {"$ref": id_str}
 
-            def _get_type_name(python_type: Type) -> str:
-                """Return the JSON schema name for a Python type"""
-                if python_type == str:
-                    return "string"
-                elif python_type == int:
-                    return "integer"
-                elif python_type == float:
-                    return "number"
-                elif python_type == bool:
-                    return "boolean"
-                elif python_type == list:
-                    return "array"
-                elif python_type == dict:
-                    return "object"
-                return "string"
-
             def _to_json_type(value: Any) -> Any:
                 """Attempt to convert a constant value (for "const" and "default") to a JSON serializable value"""
                 if value is None or type(value) in (str, int, float, bool, list, dict):
@@ -657,20 +975,59 @@ class Schema(object):
 
             # Check if we have to create a common definition and use as reference
             if allow_reference and schema.as_reference:
-                # Generate sub schema if not already done
-                if schema.name not in definitions_by_name:
-                    definitions_by_name[
-                        cast(str, schema.name)
-                    ] = {}  # Avoid infinite loop
-                    definitions_by_name[cast(str, schema.name)] = _json_schema(
-                        schema, is_main_schema=False, allow_reference=False
-                    )
+                definition_name = definition_names.get(id(schema))
+                if definition_name is None:
+                    definition_name = cast(str, schema.name)
+                    # Register before generating to avoid infinite loops
+                    definition_names[id(schema)] = definition_name
+                    if definition_name not in definitions_by_name:
+                        # Generate sub schema if not already done
+                        definitions_by_name[definition_name] = {}
+                        definition = _json_schema(
+                            schema, is_main_schema=False, allow_reference=False
+                        )
+                        definitions_by_name[definition_name] = definition
+                        definition_forms.setdefault(
+                            _canonical_form(definition), definition_name
+                        )
+                    else:
+                        # Another schema already uses this name: point to a
+                        # structurally identical definition if there is one.
+                        # The candidate is only compared, never emitted, so it
+                        # is generated against throwaway copies of the state:
+                        # its nested definitions and reusable fragments must
+                        # not leak into the output.
+                        state = (
+                            seen,
+                            definitions_by_name,
+                            definition_names,
+                            definition_forms,
+                        )
+                        seen = {}
+                        definitions_by_name = dict(definitions_by_name)
+                        definition_names = dict(definition_names)
+                        definition_forms = dict(definition_forms)
+                        try:
+                            definition = _json_schema(
+                                schema, is_main_schema=False, allow_reference=False
+                            )
+                        finally:
+                            (
+                                seen,
+                                definitions_by_name,
+                                definition_names,
+                                definition_forms,
+                            ) = state
+                        definition_name = definition_forms.get(
+                            _canonical_form(definition), definition_name
+                        )
+                        definition_names[id(schema)] = definition_name
 
-                return_schema["$ref"] = "#/definitions/" + cast(str, schema.name)
+                return_schema["$ref"] = "#/definitions/" + definition_name
             else:
                 if flavor == TYPE:
                     # Handle type
-                    return_schema["type"] = _get_type_name(s)
+                    return_schema["type"] = _JSON_SCHEMA_TYPES.get(s, "string")
                 elif flavor == ITERABLE:
                     # Handle arrays or dict schema
 
@@ -746,33 +1103,6 @@ class Schema(object):
                         if isinstance(key, Hook):
                             continue
 
-                        def _key_allows_additional_properties(key: Any) -> bool:
-                            """Check if a key is broad enough to allow additional properties"""
-                            if isinstance(key, Optional):
-                                return _key_allows_additional_properties(key.schema)
-
-                            return key == str or key == object
-
-                        def _get_key_description(key: Any) -> Union[str, None]:
-                            """Get the description associated to a key (as specified in a Literal object). Return None if not a Literal"""
-                            if isinstance(key, Optional):
-                                return _get_key_description(key.schema)
-
-                            if isinstance(key, Literal):
-                                return key.description
-
-                            return None
-
-                        def _get_key_name(key: Any) -> Any:
-                            """Get the name of a key (as specified in a Literal object). Return the key unchanged if not a Literal"""
-                            if isinstance(key, Optional):
-                                return _get_key_name(key.schema)
-
-                            if isinstance(key, Literal):
-                                return key.schema
-
-                            return key
-
                         additional_properties = (
                             additional_properties
                             or _key_allows_additional_properties(key)
@@ -815,19 +1145,13 @@ class Schema(object):
                     )
 
             if is_main_schema:
-                return_schema.update(
-                    {
-                        "$id": schema_id,
-                        "$schema": "http://json-schema.org/draft-07/schema#",
-                    }
-                )
+                return_schema["$id"] = schema_id
+                return_schema["$schema"] = _JSON_SCHEMA_DIALECT
                 if self._name:
                     return_schema["title"] = self._name
 
                 if definitions_by_name:
-                    return_schema["definitions"] = {}
-                    for definition_name, definition in definitions_by_name.items():
-                        return_schema["definitions"][definition_name] = definition
+                    return_schema["definitions"] = dict(definitions_by_name)
 
             return _create_or_use_ref(return_schema)
 
@@ -837,6 +1161,8 @@ class Schema(object):
 class Optional(Schema):
     """Marker for an optional part of the validation Schema."""
 
+    __slots__ = ("default", "key")
+
     _MARKER = object()
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
@@ -869,6 +1195,8 @@ class Optional(Schema):
 
 
 class Hook(Schema):
+    __slots__ = ("handler", "key")
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.handler: Callable[..., Any] = kwargs.pop("handler", lambda *args: None)
         super(Hook, self).__init__(*args, **kwargs)
@@ -876,6 +1204,8 @@ class Hook(Schema):
 
 
 class Forbidden(Hook):
+    __slots__ = ()
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         kwargs["handler"] = self._default_function
         super(Forbidden, self).__init__(*args, **kwargs)
@@ -888,6 +1218,8 @@ class Forbidden(Hook):
 
 
 class Literal:
+    __slots__ = ("_schema", "_description", "__weakref__")
+
     def __init__(self, value: Any, description: Union[str, None] = None) -> None:
         self._schema: Any = value
         self._description: Union[str, None] = description
@@ -908,6 +1240,8 @@ class Literal:
 
 
 class Const(Schema):
+    __slots__ = ()
+
     def validate(self, data: Any, **kwargs: Any) -> Any:
         super(Const, self).validate(data, **kwargs)
         return data
@@ -919,5 +1253,15 @@ def _callable_str(callable_: Callable[..., Any]) -> str:
     return str(callable_)
 
 
+def _canonical_form(value: Any) -> Any:
+    """Return a hashable form of a JSON schema fragment that ignores dict
+    ordering, so structurally identical fragments compare equal."""
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), _canonical_form(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_canonical_form(v) for v in value)
+    return repr(value)
+
+
 def _plural_s(sized: Sized) -> str:
     return "s" if len(sized) > 1 else ""
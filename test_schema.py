@@ -6,14 +6,13 @@ import os
 import platform
 import re
 import sys
+import threading
+import weakref
 from collections import defaultdict, namedtuple
 from functools import partial
+from itertools import permutations
 from operator import methodcaller
 
-try:
-    from unittest.mock import Mock
-except ImportError:
-    from mock import Mock
 from pytest import mark, raises
 
 from schema import (
@@ -50,6 +49,10 @@ def se(_):
     raise SchemaError("first auto", "first error")
 
 
+def always_false(_):
+    return False
+
+
 def sorted_dict(to_sort):
     """Helper function to sort list of string inside dictionaries in order to compare them"""
     if isinstance(to_sort, dict):
@@ -127,6 +130,17 @@ def test_or():
         Or().validate(2)
 
 
+def test_or_error_order():
+    with raises(SchemaError) as excinfo:
+        Or(int, lambda n: False, None, error="bad").validate("x")
+    assert excinfo.value.autos[1:] == [
+        "'x' should be instance of 'int'",
+        "<lambda>('x') should evaluate to True",
+        "None does not match 'x'",
+    ]
+    assert excinfo.value.errors == ["bad", "bad", "bad", "bad"]
+
+
 def test_or_only_one():
     or_rule = Or("test1", "test2", only_one=True)
     schema = Schema(
@@ -151,6 +165,25 @@ def test_or_only_one():
         extra_keys_schema.validate({"test1": "value", "test2": "other_value"})
 
 
+def test_or_clone():
+    or_rule = Or("test1", "test2", only_one=True, error="bad {}")
+    or_rule.match_count = 2
+    for clone in [or_rule.clone(), copy.copy(or_rule)]:
+        assert type(clone) is Or and clone is not or_rule
+        assert clone.args == or_rule.args
+        assert clone.only_one is True
+        assert clone.match_count == 0
+        with raises(SchemaError) as excinfo:
+            clone.validate("x")
+        assert excinfo.value.code == "bad x"
+    assert or_rule.match_count == 2
+
+    schema = Schema({or_rule.clone(): str, Optional("sub"): {or_rule.clone(): str}})
+    assert schema.validate({"test1": "a", "sub": {"test2": "b"}})
+    with SE:
+        schema.validate({"test1": "a", "test2": "b", "sub": {"test2": "b"}})
+
+
 def test_test():
     def unique_list(_list):
         return len(_list) == len(set(_list))
@@ -227,6 +260,15 @@ def test_validate_list():
         And([1, 0], lambda lst: len(lst) > 2).validate([0, 1])
 
 
+def test_container_type_error():
+    with raises(SchemaUnexpectedTypeError, match="0 should be instance of 'list'"):
+        Schema([1, 0]).validate(0)
+    with raises(SchemaUnexpectedTypeError) as excinfo:
+        Schema({"a": int}, error="{} is not a dict").validate([("a", 1)])
+    assert excinfo.value.autos == ["[('a', 1)] should be instance of 'dict'"]
+    assert excinfo.value.code == "[('a', 1)] is not a dict"
+
+
 def test_list_tuple_set_frozenset():
     assert Schema([int]).validate([1, 2])
     with SE:
@@ -241,6 +283,18 @@ def test_list_tuple_set_frozenset():
         Schema(tuple([int])).validate([1, 2])  # not a set
 
 
+def test_validate_list_of_type():
+    data = [1, 2, 3]
+    validated = Schema([int]).validate(data)
+    assert validated == data
+    assert validated is not data
+    with SE:
+        Schema([int]).validate([1, True])
+    assert Schema([bool]).validate([True, False]) == [True, False]
+    with raises(SchemaError, match="'1' should be instance of 'int'"):
+        Schema([int]).validate([1, "1"])
+
+
 def test_strictly():
     assert Schema(int).validate(1) == 1
     with SE:
@@ -260,60 +314,45 @@ def test_dict():
     }
     with SE:
         Schema({"n": int, "f": float}).validate({"n": 3.14, "f": 5})
-    with SE:
-        try:
-            Schema({}).validate({"abc": None, 1: None})
-        except SchemaWrongKeyError as e:
-            assert e.args[0].startswith("Wrong keys 'abc', 1 in")
-            raise
-    with SE:
-        try:
-            Schema({"key": 5}).validate({})
-        except SchemaMissingKeyError as e:
-            assert e.args[0] == "Missing key: 'key'"
-            raise
-    with SE:
-        try:
-            Schema({"key": 5}).validate({"n": 5})
-        except SchemaMissingKeyError as e:
-            assert e.args[0] == "Missing key: 'key'"
-            raise
-    with SE:
-        try:
-            Schema({"key": 5, "key2": 5}).validate({"n": 5})
-        except SchemaMissingKeyError as e:
-            assert e.args[0] == "Missing keys: 'key', 'key2'"
-            raise
-    with SE:
-        try:
-            Schema({}).validate({"n": 5})
-        except SchemaWrongKeyError as e:
-            assert e.args[0] == "Wrong key 'n' in {'n': 5}"
-            raise
-    with SE:
-        try:
-            Schema({"key": 5}).validate({"key": 5, "bad": 5})
-        except SchemaWrongKeyError as e:
-            assert e.args[0] in [
-                "Wrong key 'bad' in {'key': 5, 'bad': 5}",
-                "Wrong key 'bad' in {'bad': 5, 'key': 5}",
-            ]
-            raise
-    with SE:
-        try:
-            Schema({}).validate({"a": 5, "b": 5})
-        except SchemaError as e:
-            assert e.args[0] in [
-                "Wrong keys 'a', 'b' in {'a': 5, 'b': 5}",
-                "Wrong keys 'a', 'b' in {'b': 5, 'a': 5}",
-            ]
-            raise
 
-    with SE:
-        try:
-            Schema({int: int}).validate({"": ""})
-        except SchemaUnexpectedTypeError as e:
-            assert e.args[0] in ["'' should be instance of 'int'"]
+
+@mark.parametrize(
+    "schema, data, error_type, message",
+    [
+        (
+            {},
+            {"abc": None, 1: None},
+            SchemaWrongKeyError,
+            "Wrong keys 'abc', 1 in {'abc': None, 1: None}",
+        ),
+        ({"key": 5}, {}, SchemaMissingKeyError, "Missing key: 'key'"),
+        ({"key": 5}, {"n": 5}, SchemaMissingKeyError, "Missing key: 'key'"),
+        (
+            {"key": 5, "key2": 5},
+            {"n": 5},
+            SchemaMissingKeyError,
+            "Missing keys: 'key', 'key2'",
+        ),
+        ({}, {"n": 5}, SchemaWrongKeyError, "Wrong key 'n' in {'n': 5}"),
+        (
+            {"key": 5},
+            {"key": 5, "bad": 5},
+            SchemaWrongKeyError,
+            "Wrong key 'bad' in {'key': 5, 'bad': 5}",
+        ),
+        (
+            {},
+            {"a": 5, "b": 5},
+            SchemaWrongKeyError,
+            "Wrong keys 'a', 'b' in {'a': 5, 'b': 5}",
+        ),
+        ({int: int}, {"": ""}, SchemaMissingKeyError, "Missing key: <class 'int'>"),
+    ],
+)
+def test_dict_key_errors(schema, data, error_type, message):
+    with raises(error_type) as excinfo:
+        Schema(schema).validate(data)
+    assert excinfo.value.args[0] == message
 
 
 def test_dict_keys():
@@ -369,21 +408,21 @@ def test_dict_forbidden_keys():
 
 
 def test_dict_hook():
-    function_mock = Mock(return_value=None)
-    hook = Hook("b", handler=function_mock)
+    calls = []
+    hook = Hook("b", handler=lambda *args: calls.append(args))
 
     assert Schema({hook: str, Optional("b"): object}).validate({"b": "bye"}) == {
         "b": "bye"
     }
-    function_mock.assert_called_once()
+    assert len(calls) == 1
 
     assert Schema({hook: int, Optional("b"): object}).validate({"b": "bye"}) == {
         "b": "bye"
     }
-    function_mock.assert_called_once()
+    assert len(calls) == 1
 
     assert Schema({hook: str, "b": object}).validate({"b": "bye"}) == {"b": "bye"}
-    assert function_mock.call_count == 2
+    assert len(calls) == 2
 
 
 def test_dict_optional_keys():
@@ -419,6 +458,100 @@ def test_dict_optional_defaults():
         Optional(And(str, Use(int)), default=7)
 
 
+def test_iter_validate():
+    items = Schema([{"id": Use(int)}]).iter_validate(iter([{"id": "1"}, {"id": "2"}]))
+    assert next(items) == {"id": 1}
+    assert list(items) == [{"id": 2}]
+    with SE:
+        list(Schema((int, float)).iter_validate([1, "x"]))
+    with raises(TypeError):
+        Schema({"id": int}).iter_validate([])
+
+
+def test_dict_literal_and_other_keys():
+    schema = Schema(
+        {"a": 1, Optional("b"): 2, Optional(Literal("c")): 3, str: 4, Optional(1): int}
+    )
+    data = {"a": 1, "b": 2, "c": 3, "d": 4, 1: 5}
+    assert schema.validate(data) == data
+    assert schema.validate({"a": 1, "e": 4}) == {"a": 1, "e": 4}
+    with SE:
+        schema.validate({"a": 1, "b": 4})
+    with SE:
+        schema.validate({"a": 1, 2: 5})
+    # Equal literals of different types still match each other
+    assert Schema({1: str}).validate({True: "x"}) == {True: "x"}
+
+
+def test_dict_key_with_custom_equality():
+    class CaseInsensitive(str):
+        def __eq__(self, other):
+            return self.lower() == str(other).lower()
+
+        def __hash__(self):
+            return hash(self.lower())
+
+    key = CaseInsensitive("key")
+    assert Schema({"Key": int}).validate({key: 1}) == {key: 1}
+    with raises(SchemaMissingKeyError):
+        Schema({"Key": int}).validate({CaseInsensitive("other"): 1})
+
+
+def test_schema_changed_after_validation():
+    schema = Schema({"a": int})
+    assert schema.validate({"a": 1}) == {"a": 1}
+    schema.schema["b"] = str
+    with raises(SchemaMissingKeyError, match="Missing key: 'b'"):
+        schema.validate({"a": 1})
+    schema.schema["a"] = str
+    assert schema.validate({"a": "x", "b": "y"}) == {"a": "x", "b": "y"}
+    del schema.schema["b"]
+    with raises(SchemaWrongKeyError):
+        schema.validate({"a": "x", "b": "y"})
+
+    items = [int]
+    schema = Schema(items)
+    assert schema.validate([1]) == [1]
+    with SE:
+        schema.validate([1, "x"])
+    items.append(str)
+    assert schema.validate([1, "x"]) == [1, "x"]
+
+
+def test_dict_first_validation_from_threads():
+    data = {"k%d" % n: n for n in range(30)}
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(50):
+            schema = Schema({"k%d" % n: int for n in range(30)})
+            barrier = threading.Barrier(4)
+            results = []
+
+            def validate():
+                barrier.wait()
+                results.append((schema.is_valid(data), schema.is_valid({})))
+
+            threads = [threading.Thread(target=validate) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert results == [(True, False)] * 4
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_dict_type_keys():
+    schema = Schema({str: int, int: str, bool: float})
+    data = {"a": 1, 2: "b", True: 1.0}
+    assert schema.validate(data) == data
+    with SE:
+        schema.validate({"a": 1, 2: "b", True: "c"})
+    with SE:
+        schema.validate({"a": 1, 2.0: "b"})
+
+
 def test_dict_subtypes():
     d = defaultdict(int, key=1)
     v = Schema({"key": 1}).validate(d)
@@ -501,6 +634,37 @@ def test_use_error_handling():
         assert e.errors == ["second error", "first error"]
 
 
+def test_use_cache():
+    calls = []
+
+    def lower(s):
+        calls.append(s)
+        return s.lower()
+
+    schema = Schema([Use(lower, cache=True)])
+    assert schema.validate(["A", "B", "A"]) == ["a", "b", "a"]
+    assert calls == ["A", "B"]
+    # Equal values of different types are cached separately
+    assert Schema([Use(str, cache=True)]).validate([1, True, 1.0]) == [
+        "1",
+        "True",
+        "1.0",
+    ]
+    # Unhashable data is passed through without caching
+    assert Use(len, cache=True).validate([1, 2]) == 2
+    # Containers are not cached, so their items keep their own types and
+    # every validation gets a fresh result
+    schema = Use(list, cache=True)
+    assert schema.validate((1,)) == [1]
+    result = schema.validate((True,))
+    assert result == [True] and result[0] is True
+    result.append(2)
+    assert schema.validate((True,)) == [True]
+    with raises(SchemaError) as excinfo:
+        Use(ve, cache=True).validate("x")
+    assert excinfo.value.autos == ["ve('x') raised ValueError()"]
+
+
 def test_or_error_handling():
     try:
         Or(ve).validate("x")
@@ -597,6 +761,27 @@ def test_use_json():
     assert gist_schema.validate(gist)
 
 
+def test_use_json_dict():
+    gist_schema = Schema(
+        {
+            Optional("description"): basestring,
+            "public": bool,
+            "files": {basestring: {"content": basestring}},
+        }
+    )
+    gist = {
+        "description": "the description for this gist",
+        "public": True,
+        "files": {
+            "file1.txt": {"content": "String file contents"},
+            "other.txt": {"content": "Another file contents"},
+        },
+    }
+    assert gist_schema.validate(gist) == gist
+    with SE:
+        gist_schema.validate({"public": True, "files": {"file1.txt": {}}})
+
+
 def test_error_reporting():
     s = Schema(
         {
@@ -721,22 +906,21 @@ def test_optional_key_convert_failed_randomly_while_with_another_optional_object
 
     fmt = "%Y-%m-%d %H:%M:%S"
     _datetime_validator = Or(None, Use(lambda i: datetime.datetime.strptime(i, fmt)))
-    # FIXME given tests enough
-    for i in range(1024):
-        s = Schema(
-            {
-                Optional("created_at"): _datetime_validator,
-                Optional("updated_at"): _datetime_validator,
-                Optional("birth"): _datetime_validator,
-                Optional(basestring): object,
-            }
-        )
+    schema_items = [
+        (Optional("created_at"), _datetime_validator),
+        (Optional("updated_at"), _datetime_validator),
+        (Optional("birth"), _datetime_validator),
+        (Optional(basestring), object),
+    ]
+    # The failure depended on the order in which the keys were tried, so
+    # check every key order instead of repeating a single one
+    for items in permutations(schema_items):
+        s = Schema(dict(items))
         data = {"created_at": "2015-10-10 00:00:00"}
         validated_data = s.validate(data)
         # is expected to be converted to a datetime instance, but fails randomly
         # (most of the time)
         assert isinstance(validated_data["created_at"], datetime.datetime)
-        # assert isinstance(validated_data['created_at'], basestring)
 
 
 def test_copy():
@@ -1360,6 +1544,17 @@ def test_json_schema_root_not_dict(input_schema, expected_keyword, expected_valu
     }
 
 
+def test_json_schema_root_type_with_name_and_description():
+    s = Schema(int, name="my-name", description="An int")
+    assert s.json_schema("my-id") == {
+        "description": "An int",
+        "type": "integer",
+        "$id": "my-id",
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "title": "my-name",
+    }
+
+
 @mark.parametrize(
     "input_schema, expected_keyword, expected_value",
     [([1, 2, 3], "enum", [1, 2, 3]), ([1], "const", 1), ([str], "type", "string")],
@@ -1892,6 +2087,51 @@ def test_json_schema_definitions_invalid():
         _ = Schema({"test1": str}, as_reference=True)
 
 
+def test_json_schema_definitions_same_name_structural_match():
+    first = Schema({"key": int}, name="shared", as_reference=True)
+    other = Schema({"key": str}, name="other", as_reference=True)
+    clash = Schema({"key": str}, name="shared", as_reference=True)
+    main_schema = Schema({"a": first, "b": other, "c": clash})
+
+    json_schema = main_schema.json_schema("my-id")
+    assert json_schema["properties"] == {
+        "a": {"$ref": "#/definitions/shared"},
+        "b": {"$ref": "#/definitions/other"},
+        "c": {"$ref": "#/definitions/other"},
+    }
+    assert sorted(json_schema["definitions"]) == ["other", "shared"]
+
+
+def test_json_schema_definitions_same_name_no_orphan():
+    first = Schema({"k": int}, name="shared", as_reference=True)
+    inner = Schema({"z": int}, name="inner_only", as_reference=True)
+    clash = Schema({"k": inner}, name="shared", as_reference=True)
+    json_schema = Schema({"a": first, "b": clash}).json_schema("my-id")
+    assert json_schema["properties"] == {
+        "a": {"$ref": "#/definitions/shared"},
+        "b": {"$ref": "#/definitions/shared"},
+    }
+    assert list(json_schema["definitions"]) == ["shared"]
+
+
+def test_json_schema_definitions_same_name_no_dangling_ref():
+    first = Schema({"k": int}, name="shared", as_reference=True)
+    clash = Schema({"k": {"x": str, "y": int}}, name="shared", as_reference=True)
+    main_schema = Schema({"a": first, "b": clash, "d": {"x": str, "y": int}})
+    json_schema = main_schema.json_schema("my-id", use_refs=True)
+    assert json_schema["properties"]["d"]["properties"]["x"] == {"type": "string"}
+
+    def collect(value, key):
+        if not isinstance(value, dict):
+            return []
+        found = [value[key]] if key in value else []
+        return found + [v for item in value.values() for v in collect(item, key)]
+
+    ids = collect(json_schema, "$id")
+    for ref in collect(json_schema, "$ref"):
+        assert ref.startswith("#/definitions/") or ref in ids
+
+
 def test_json_schema_default_value():
     s = Schema({Optional("test1", default=42): int})
     assert s.json_schema("my-id") == {
@@ -1940,48 +2180,85 @@ def test_json_schema_default_is_tuple():
     }
 
 
+JSON_SCHEMA_DEFAULT_IS_LITERAL = {
+    "type": "object",
+    "properties": {"test1": {"type": "string", "default": "Hello!"}},
+    "required": [],
+    "additionalProperties": False,
+    "$id": "my-id",
+    "$schema": "http://json-schema.org/draft-07/schema#",
+}
+
+
+SCHEMA_DEFAULT_IS_LITERAL = Schema({Optional("test1", default=Literal("Hello!")): str})
+
+
 def test_json_schema_default_is_literal():
-    s = Schema({Optional("test1", default=Literal("Hello!")): str})
-    assert s.json_schema("my-id") == {
-        "type": "object",
-        "properties": {"test1": {"type": "string", "default": "Hello!"}},
-        "required": [],
-        "additionalProperties": False,
-        "$id": "my-id",
-        "$schema": "http://json-schema.org/draft-07/schema#",
-    }
+    assert (
+        SCHEMA_DEFAULT_IS_LITERAL.json_schema("my-id") == JSON_SCHEMA_DEFAULT_IS_LITERAL
+    )
 
 
-def test_prepend_schema_name():
-    try:
-        Schema({"key1": int}).validate({"key1": "a"})
-    except SchemaError as e:
-        assert str(e) == "Key 'key1' error:\n'a' should be instance of 'int'"
+SCHEMA_KEY1_INT = Schema({"key1": int})
+SCHEMA_KEY1_INT_NAMED = Schema({"key1": int}, name="custom_schemaname")
+SCHEMA_INT_NAMED = Schema(int, name="custom_schemaname")
+SCHEMA_OR_DICT_ERROR = Schema(Or({"a": 1}, error="error: {}"))
+SCHEMA_CALLABLE_ERROR = Schema(always_false, error="{}")
 
-    try:
-        Schema({"key1": int}, name="custom_schemaname").validate({"key1": "a"})
-    except SchemaError as e:
-        assert (
-            str(e)
-            == "'custom_schemaname' Key 'key1' error:\n'a' should be instance of 'int'"
-        )
 
-    try:
-        Schema(int, name="custom_schemaname").validate("a")
-    except SchemaUnexpectedTypeError as e:
-        assert str(e) == "'custom_schemaname' 'a' should be instance of 'int'"
+@mark.parametrize(
+    "schema, data, error_type, message",
+    [
+        (
+            SCHEMA_KEY1_INT,
+            {"key1": "a"},
+            SchemaError,
+            "Key 'key1' error:\n'a' should be instance of 'int'",
+        ),
+        (
+            SCHEMA_KEY1_INT_NAMED,
+            {"key1": "a"},
+            SchemaError,
+            "'custom_schemaname' Key 'key1' error:\n'a' should be instance of 'int'",
+        ),
+        (
+            SCHEMA_INT_NAMED,
+            "a",
+            SchemaUnexpectedTypeError,
+            "'custom_schemaname' 'a' should be instance of 'int'",
+        ),
+    ],
+)
+def test_prepend_schema_name(schema, data, error_type, message):
+    with raises(error_type) as excinfo:
+        schema.validate(data)
+    assert excinfo.value.code == message
 
 
 def test_dict_literal_error_string():
     # this is a simplified regression test of the bug in github issue #240
-    assert Schema(Or({"a": 1}, error="error: {}")).is_valid(dict(a=1))
+    assert SCHEMA_OR_DICT_ERROR.is_valid(dict(a=1))
 
 
 def test_callable_error():
     # this tests for the behavior desired in github pull request #238
-    e = None
-    try:
-        Schema(lambda d: False, error="{}").validate("This is the error message")
-    except SchemaError as ex:
-        e = ex
-    assert e.errors == ["This is the error message"]
+    with raises(SchemaError) as excinfo:
+        SCHEMA_CALLABLE_ERROR.validate("This is the error message")
+    assert excinfo.value.errors == ["This is the error message"]
+
+
+def test_weakref():
+    for s in [
+        Schema(int),
+        And(int),
+        Or(int),
+        Regex("^a"),
+        Use(int),
+        Optional("key"),
+        Hook("key"),
+        Forbidden("key"),
+        Const(int),
+        Literal("key"),
+    ]:
+        ref = weakref.ref(s)
+        assert ref() is s